@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import pandas as pd
+import numpy as np
+
+# Experiment directories are named <option>_<scheme>[_<case>][_loss<N>] by run_experiments.sh
+EXPERIMENT_RE = re.compile(r'^(?P<option>[abcd])_(?P<scheme>highspeed|yeah|bbr)'
+                           r'(?:_(?P<case>1|2a|2b|2c))?(?:_loss(?P<loss>[\d.]+))?$')
+
+SUMMARY_FIELDS = {
+    'Goodput': ('goodput_mbps', lambda v: float(v.split()[0])),
+    'Packet Loss Rate': ('loss_rate', float),
+    'Maximum Window Size': ('max_window_bytes', lambda v: int(v.split()[0])),
+}
+
+METRICS = {
+    'goodput_mbps': 'Goodput (Mbps)',
+    'loss_rate': 'Packet Loss Rate',
+    'max_window_bytes': 'Maximum Window Size (bytes)',
+}
+
+SCHEMES = ['highspeed', 'yeah', 'bbr']
+
+
+def parse_experiment_name(name):
+    """Split an experiment directory name into option, scheme, case and loss"""
+    match = EXPERIMENT_RE.match(name)
+    if not match:
+        return None
+    fields = match.groupdict()
+    fields['loss'] = float(fields['loss']) if fields['loss'] else 0.0
+    fields['case'] = fields['case'] or ''
+    scenario = fields['option']
+    if fields['case']:
+        scenario += f"_{fields['case']}"
+    if fields['loss']:
+        scenario += f"_loss{fields['loss']:g}"
+    fields['scenario'] = scenario
+    return fields
+
+
+def parse_summary(summary_file):
+    """Parse the metrics out of a summary_<scheme>.txt file"""
+    metrics = {}
+    with open(summary_file) as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key.strip() in SUMMARY_FIELDS:
+                column, convert = SUMMARY_FIELDS[key.strip()]
+                metrics[column] = convert(value.strip())
+    return metrics
+
+
+def analyze_capture(pcap_file):
+    """Compute the summary metrics straight from a capture (slow, used when no current summary exists)"""
+    # Imported here so parsing summaries never pays for loading scapy
+    import traffic_analyzer
+    max_window, _, _ = traffic_analyzer.find_max_window_size(pcap_file)
+    return {
+        'goodput_mbps': traffic_analyzer.calculate_goodput(pcap_file),
+        'loss_rate': traffic_analyzer.calculate_packet_loss(pcap_file),
+        'max_window_bytes': int(max_window),
+    }
+
+
+def file_hash(path, cache):
+    """Return the SHA-256 of a file, reusing the cached hash while size and mtime are unchanged"""
+    stat = os.stat(path)
+    entry = cache.get(path)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    cache[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+    return cache[path]['sha256']
+
+
+def experiment_inputs(exp_dir, scheme):
+    """Files an experiment's metrics depend on.
+
+    The capture is upstream of the summary, so it is always a dependency when
+    present: re-recording it makes the experiment stale even if the summary was
+    not rewritten. A profile report, if present, adds the analyzer run time.
+    """
+    inputs = {}
+    for key, filename in [('summary', f'summary_{scheme}.txt'), ('capture', 'capture.pcap'),
+                          ('profile', f'profile_{scheme}.json')]:
+        path = os.path.join(exp_dir, filename)
+        if os.path.exists(path):
+            inputs[key] = path
+    return inputs
+
+
+def summary_is_current(inputs):
+    """True if the summary exists and was written after the capture it summarizes"""
+    if 'summary' not in inputs:
+        return False
+    if 'capture' not in inputs:
+        return True
+    return os.stat(inputs['summary']).st_mtime_ns >= os.stat(inputs['capture']).st_mtime_ns
+
+
+def compute_metrics(inputs):
+    """Compute an experiment's metrics from its input files.
+
+    The summary is used when it is newer than the capture; otherwise the
+    capture is analyzed directly.
+    """
+    if summary_is_current(inputs):
+        metrics = parse_summary(inputs['summary'])
+        metrics['source'] = 'summary'
+    else:
+        metrics = analyze_capture(inputs['capture'])
+        metrics['source'] = 'capture'
+    if 'profile' in inputs:
+        with open(inputs['profile']) as f:
+            metrics['analysis_wall_s'] = json.load(f).get('wall_s')
+    return metrics
+
+
+def load_cache(cache_file):
+    """Load the dependency cache, or start an empty one"""
+    if os.path.exists(cache_file):
+        with open(cache_file) as f:
+            return json.load(f)
+    return {'files': {}, 'experiments': {}, 'report': {}}
+
+
+def collect(results_dir, cache, jobs=None, force=False):
+    """Build the per-experiment metrics table, recomputing only stale experiments.
+
+    Each experiment node depends on the content hashes of its input files; an
+    experiment is recomputed only when that set of hashes changes.
+    """
+    experiments = {}
+    stale = {}
+    for name in sorted(os.listdir(results_dir)):
+        exp_dir = os.path.join(results_dir, name)
+        fields = parse_experiment_name(name)
+        if not fields or not os.path.isdir(exp_dir):
+            continue
+        inputs = experiment_inputs(exp_dir, fields['scheme'])
+        if not inputs:
+            continue
+        hashes = {path: file_hash(path, cache['files']) for path in inputs.values()}
+        cached = cache['experiments'].get(name)
+        if not force and cached and cached['inputs'] == hashes:
+            experiments[name] = cached
+        else:
+            experiments[name] = {'fields': fields, 'inputs': hashes}
+            stale[name] = inputs
+
+    # Parsing summaries is cheap, analyzing captures is not, so fan those out
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {name: pool.submit(compute_metrics, inputs) for name, inputs in stale.items()}
+        for name, future in futures.items():
+            experiments[name]['metrics'] = future.result()
+
+    # Forget experiments whose directories are gone
+    cache['experiments'] = experiments
+    cache['files'] = {path: entry for path, entry in cache['files'].items() if os.path.exists(path)}
+
+    rows = [dict(experiment=name, **exp['fields'], **exp['metrics']) for name, exp in experiments.items()]
+    return pd.DataFrame(rows), sorted(stale)
+
+
+def plot_comparison(table, metric, label, output_file):
+    """Grouped bar chart of one metric, scenarios on the x axis and one bar per scheme"""
+    schemes = [scheme for scheme in SCHEMES if scheme in table.columns]
+    x = np.arange(len(table.index))
+    width = 0.8 / max(len(schemes), 1)
+
+    plt.figure(figsize=(max(10, len(table.index) * 0.6), 6))
+    for i, scheme in enumerate(schemes):
+        plt.bar(x + (i - (len(schemes) - 1) / 2) * width, table[scheme].values, width, label=scheme)
+    plt.xticks(x, table.index, rotation=45, ha='right')
+    plt.xlabel('Scenario')
+    plt.ylabel(label)
+    plt.title(f'{label} by Scenario and Congestion Control')
+    plt.grid(True, axis='y', alpha=0.3)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(output_file)
+    plt.close()
+
+
+def write_report(df, output_dir, cache, force=False):
+    """Write the combined table, comparison tables and plots if the table changed"""
+    df = df.sort_values(['option', 'case', 'loss', 'scheme']).reset_index(drop=True)
+
+    # e.g. d_bbr_2a_loss1 and d_bbr_2a_loss1.0 describe the same experiment
+    duplicates = df[df.duplicated(['scenario', 'scheme'], keep=False)]
+    for (scenario, scheme), group in duplicates.groupby(['scenario', 'scheme']):
+        print(f"Warning: {', '.join(group['experiment'])} are all {scheme} in scenario {scenario}; "
+              f"their metrics are averaged in the comparison tables")
+    table_digest = hashlib.sha256(df.to_csv(index=False).encode()).hexdigest()
+    outputs = [os.path.join(output_dir, 'results_table.csv')]
+    outputs += [os.path.join(output_dir, f'comparison_{metric}.{ext}') for metric in METRICS for ext in ('csv', 'png')]
+
+    if not force and cache['report'].get('table_digest') == table_digest and all(map(os.path.exists, outputs)):
+        return False
+
+    df.to_csv(outputs[0], index=False)
+    scenario_order = list(dict.fromkeys(df['scenario']))
+    for metric, label in METRICS.items():
+        table = df.pivot_table(index='scenario', columns='scheme', values=metric,
+                               aggfunc='mean').reindex(scenario_order)
+        table = table[[scheme for scheme in SCHEMES if scheme in table.columns]]
+        table.to_csv(os.path.join(output_dir, f'comparison_{metric}.csv'))
+        plot_comparison(table, metric, label, os.path.join(output_dir, f'comparison_{metric}.png'))
+
+    cache['report']['table_digest'] = table_digest
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate and compare experiment results')
+    parser.add_argument('--results_dir', type=str, default='congestion_control_results',
+                        help='Directory containing the per-experiment result directories')
+    parser.add_argument('--output_dir', type=str, default='aggregate_report',
+                        help='Directory to save the table, comparisons and plots')
+    parser.add_argument('--cache', type=str,
+                        help='Dependency cache file (default: <output_dir>/aggregate_cache.json)')
+    parser.add_argument('--jobs', type=int,
+                        help='Parallel workers for analyzing captures without a summary')
+    parser.add_argument('--force', action='store_true',
+                        help='Ignore the cache and recompute everything')
+
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    cache_file = args.cache or os.path.join(args.output_dir, 'aggregate_cache.json')
+    cache = load_cache(cache_file)
+
+    df, recomputed = collect(args.results_dir, cache, args.jobs, args.force)
+    if df.empty:
+        print(f"No experiment results found in {args.results_dir}")
+        return
+
+    print(f"Experiments: {len(df)} ({len(recomputed)} recomputed)")
+    for name in recomputed:
+        print(f"  updated {name}")
+
+    # Save the experiment cache first so a failing report does not force a full recompute
+    with open(cache_file, 'w') as f:
+        json.dump(cache, f, indent=2)
+
+    if write_report(df, args.output_dir, cache, args.force):
+        print(f"Report written to {args.output_dir}")
+    else:
+        print("Report is up to date")
+
+    with open(cache_file, 'w') as f:
+        json.dump(cache, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from pcap_generator import generate_pcap, write_connection_file
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYSIS_SCRIPT = os.path.join(SCRIPT_DIR, '..', 'Task_2', 'analysis.py')
+
+# traffic_analyzer.py functions benchmarked on the generated pcaps
+METRICS = ['analyze_throughput', 'calculate_goodput', 'calculate_packet_loss', 'find_max_window_size']
+TARGETS = METRICS + ['analysis_pipeline']
+
+# analysis.py works on connection listings rather than packets
+UNITS = dict({metric: 'packets' for metric in METRICS}, analysis_pipeline='records')
+
+DEFAULT_SIZES = [10**4, 10**5, 10**6]
+
+
+def run_worker(target, path):
+    """Run one target in this process and print its timing as JSON.
+
+    Imports happen before the timer starts, so every target is timed without
+    interpreter start-up or module loading.
+    """
+    if target == 'analysis_pipeline':
+        import pandas, seaborn, matplotlib.pyplot  # noqa: F401 (loaded before timing)
+        os.chdir(path)
+        start = time.perf_counter()
+        runpy.run_path(os.path.abspath(ANALYSIS_SCRIPT), run_name='__main__')
+    else:
+        import traffic_analyzer
+        start = time.perf_counter()
+        getattr(traffic_analyzer, target)(path)
+    print(json.dumps({'elapsed': time.perf_counter() - start}))
+
+
+def run_measured(cmd, cwd, timeout):
+    """Run a command in its own process and return its wall time, exit code,
+    peak RSS (MB) and last stdout line, or None if it timed out.
+
+    Each run gets a fresh process so peak RSS is not polluted by earlier runs.
+    """
+    env = dict(os.environ, MPLBACKEND='Agg')
+    with tempfile.TemporaryFile('w+') as out:
+        start = time.perf_counter()
+        proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=out, stderr=subprocess.DEVNULL)
+        while True:
+            pid, status, rusage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            if time.perf_counter() - start > timeout:
+                proc.kill()
+                os.wait4(proc.pid, 0)
+                return None
+            time.sleep(0.01)
+        wall = time.perf_counter() - start
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        out.seek(0)
+        lines = out.read().strip().splitlines()
+
+    return {
+        'wall': wall,
+        'returncode': proc.returncode,
+        'peak_rss_mb': rusage.ru_maxrss / 1024,  # ru_maxrss is in KB on Linux
+        'last_line': lines[-1] if lines else '',
+    }
+
+
+def benchmark_target(target, size, workdir, timeout):
+    """Benchmark one target at one input size and return a result dict"""
+    if target == 'analysis_pipeline':
+        # analysis.py reads two connection listings from its working directory
+        write_connection_file(os.path.join(workdir, 'nonvulnerable_connections.txt'), size, seed=1)
+        write_connection_file(os.path.join(workdir, 'weaken_connections.txt'), size, seed=2)
+        path = workdir
+    else:
+        path = os.path.join(workdir, f'bench_{size}.pcap')
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', target, path]
+
+    unit = UNITS[target]
+    report = run_measured(cmd, workdir, timeout)
+    if report is None:
+        print(f"  {target:<24} {size:>12} {unit}: timed out after {timeout}s")
+        return {'target': target, 'size': size, 'unit': unit, 'status': 'timeout'}
+    if report['returncode'] != 0 or not report['last_line'].startswith('{'):
+        print(f"  {target:<24} {size:>12} {unit}: failed (exit code {report['returncode']})")
+        return {'target': target, 'size': size, 'unit': unit, 'status': 'failed'}
+
+    run_time = json.loads(report['last_line'])['elapsed']
+    result = {
+        'target': target,
+        'size': size,
+        'unit': unit,
+        'status': 'ok',
+        'seconds': run_time,
+        'per_sec': size / run_time if run_time > 0 else 0,
+        'peak_rss_mb': report['peak_rss_mb'],
+    }
+    print(f"  {target:<24} {size:>12} {unit}: {result['per_sec']:>12.0f} {unit}/s, "
+          f"{result['peak_rss_mb']:>8.1f} MB peak RSS")
+    return result
+
+
+def check_regressions(results, baseline, tolerance):
+    """Compare results against a stored baseline and return a list of regressions"""
+    expected = {(r['target'], r['size']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        base = expected.get((result['target'], result['size']))
+        if not base or base.get('status') != 'ok':
+            continue
+        if result['status'] != 'ok':
+            regressions.append(f"{result['target']} @ {result['size']}: {result['status']}")
+            continue
+        unit = result['unit']
+        if result['per_sec'] < base['per_sec'] * (1 - tolerance):
+            regressions.append(f"{result['target']} @ {result['size']} {unit}: "
+                               f"{result['per_sec']:.0f} {unit}/s vs baseline "
+                               f"{base['per_sec']:.0f} {unit}/s")
+        if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{result['target']} @ {result['size']} {unit}: "
+                               f"{result['peak_rss_mb']:.1f} MB peak RSS vs baseline "
+                               f"{base['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def plot_scaling(results, output_file):
+    """Plot items/s and peak RSS against input size for every target"""
+    fig, (ax_rate, ax_rss) = plt.subplots(1, 2, figsize=(14, 6))
+    for target in TARGETS:
+        points = [r for r in results if r['target'] == target and r['status'] == 'ok']
+        if not points:
+            continue
+        sizes = [r['size'] for r in points]
+        label = f"{target} ({UNITS[target]})"
+        ax_rate.plot(sizes, [r['per_sec'] for r in points], marker='o', label=label)
+        ax_rss.plot(sizes, [r['peak_rss_mb'] for r in points], marker='o', label=label)
+
+    ax_rate.set_xscale('log')
+    ax_rate.set_yscale('log')
+    ax_rate.set_xlabel('Input size (packets or connection records)')
+    ax_rate.set_ylabel('Items processed per second')
+    ax_rate.set_title('Analyzer Throughput Scaling')
+    ax_rate.grid(True)
+    ax_rate.legend()
+
+    ax_rss.set_xscale('log')
+    ax_rss.set_yscale('log')
+    ax_rss.set_xlabel('Input size (packets or connection records)')
+    ax_rss.set_ylabel('Peak RSS (MB)')
+    ax_rss.set_title('Analyzer Memory Scaling')
+    ax_rss.grid(True)
+    ax_rss.legend()
+
+    plt.tight_layout()
+    plt.savefig(output_file)
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the traffic analyzers on synthetic captures')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Input sizes in packets, or connection records for analysis_pipeline '
+                             '(e.g. 10000 ... 100000000)')
+    parser.add_argument('--targets', type=str, nargs='+', choices=TARGETS, default=TARGETS,
+                        help='Metrics/pipelines to benchmark')
+    parser.add_argument('--flows', type=int, default=10,
+                        help='Concurrent flows in the generated captures')
+    parser.add_argument('--loss', type=float, default=0.01,
+                        help='Loss rate in the generated captures')
+    parser.add_argument('--retransmit', type=float, default=0.001,
+                        help='Spurious retransmission rate in the generated captures')
+    parser.add_argument('--sll', action='store_true',
+                        help='Generate SLL-framed captures like `tcpdump -i any`')
+    parser.add_argument('--snaplen', type=int, default=128,
+                        help='Snapshot length of the generated captures')
+    parser.add_argument('--timeout', type=float, default=3600,
+                        help='Per-run timeout in seconds')
+    parser.add_argument('--output_dir', type=str, default='benchmark_results',
+                        help='Directory to save results and scaling plots')
+    parser.add_argument('--baseline', type=str,
+                        help='Baseline JSON to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Allowed relative slowdown/memory growth before flagging a regression')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the results to --baseline instead of checking against it')
+    parser.add_argument('--worker', nargs=2, metavar=('TARGET', 'PATH'),
+                        help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    # Internal mode used to isolate each run in its own process
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    results = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sorted(args.sizes):
+            print(f"Benchmarking with input size {size}...")
+            if any(target in METRICS for target in args.targets):
+                pcap_file = os.path.join(workdir, f'bench_{size}.pcap')
+                generate_pcap(pcap_file, size, flows=args.flows, loss=args.loss,
+                              retransmit=args.retransmit, sll=args.sll, snaplen=args.snaplen)
+            for target in args.targets:
+                results.append(benchmark_target(target, size, workdir, args.timeout))
+            # Captures at the top sizes are tens of GB, so drop them as we go
+            if os.path.exists(os.path.join(workdir, f'bench_{size}.pcap')):
+                os.remove(os.path.join(workdir, f'bench_{size}.pcap'))
+
+    with open(f"{args.output_dir}/benchmark.json", 'w') as f:
+        json.dump({'results': results}, f, indent=2)
+    plot_scaling(results, f"{args.output_dir}/scaling.png")
+    print(f"Results saved to {args.output_dir}")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = check_regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("Performance regressions detected:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
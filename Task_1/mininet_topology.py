@@ -6,13 +6,20 @@ from mininet.link import TCLink
 from mininet.cli import CLI
 from mininet.log import setLogLevel
 import argparse
+import json
+import re
 import time
 import os
 import sys
+import numpy as np
+from topology_builder import TOPOLOGIES, build_network, check_parameters, link_options
 
 def create_network(option, congestion_control, link_loss=0, case=None):
     """Create the Mininet topology based on the specified option."""
 
+    # Look up the clients first so a bad scenario fails before anything is started
+    schedule = CLIENT_SCHEDULES[option if option in ['a', 'b'] else case]
+
     # Create network with OVS switches
     net = Mininet(controller=Controller, switch=OVSKernelSwitch, link=TCLink)
 
@@ -91,143 +98,326 @@ def create_network(option, congestion_control, link_loss=0, case=None):
             host.cmd(f'sysctl -w net.ipv4.tcp_congestion_control={congestion_control}')
     
     
-    print ("Starting iperf3 server on h7...")
-    h7.cmd('iperf3 -s -p 5201 &')
-    
+    servers = start_servers(net, [(client, 'h7') for client, _, _ in schedule])
+    return net, servers
+
+
+def start_servers(net, pairs):
+    """Start an iperf3 server for every (client, server) pair and return {client: (server, port)}.
+
+    iperf3 servers handle one test at a time, so every client gets its own
+    port, starting at 5201.
+    """
+    servers = {}
+    for i, (client, server) in enumerate(pairs):
+        port = 5201 + i
+        net.get(server).cmd(f'iperf3 -s -p {port} &')
+        servers[client] = (server, port)
+    print(f"Started {len(servers)} iperf3 servers")
+
     time.sleep(2)
-    
-    print ("Server started on h7")
-    
-    if "iperf3" in h7.cmd("ps aux"):
-        print("iperf3 server is running on h7")
-    
-    else:
-        print("Error: iperf3 server is not running on h7. Restarting...")
-        h7.cmd('iperf3 -s -p 5201 &')
-        
-    # print(f"sys.argv: {sys.argv}")
-    
-    # Run experiments based on option
-    if option == 'a':
-        # Single client on h1
-        print("Starting iperf3 client on h1...")
-        h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control}')
-        # print("iperf3 client output:\n", output)
-        print(f"Started client on h1 connecting to {h7.IP()}")
-    
-    elif option == 'b':
-        # Staggered clients on h1, h3, h4
-        h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-        print(f"Started client on h1 connecting to {h7.IP()}")
 
+    for server, port in servers.values():
+        host = net.get(server)
+        if f"-p {port}" not in host.cmd("ps aux | grep '[i]perf3 -s'"):
+            print(f"Error: iperf3 server is not running on {server} port {port}. Restarting...")
+            host.cmd(f'iperf3 -s -p {port} &')
+    return servers
+
+
+def create_scaled_network(args):
+    """Build a parameterized topology for scaling studies and start one iperf3 server per flow.
+
+    Returns the network, a client schedule starting every flow at once, and the
+    (server, port) each client connects to. Setup timings are saved to
+    topology.json in the output directory.
+    """
+    host_link = link_options(args.host_bw, args.host_delay, args.host_loss, args.host_queue)
+    core_link = link_options(args.link_bw, args.link_delay, args.link_loss, args.link_queue)
+    net, pairs, timings = build_network(args.topology, args.hosts, args.switches, args.k,
+                                        host_link, core_link)
+
+    for host in net.hosts:
+        host.cmd(f'sysctl -w net.ipv4.tcp_congestion_control={args.congestion}')
+
+    servers = start_servers(net, pairs)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    with open(f"{args.output_dir}/topology.json", 'w') as f:
+        json.dump(dict(timings, topology=args.topology, host_link=host_link, core_link=core_link,
+                       flows=len(pairs)), f, indent=2)
+
+    schedule = [(client, 0, args.duration) for client, _ in pairs]
+    return net, schedule, servers
 
-        time.sleep(15)
-        h3.cmd(f'timeout 125 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 120 -C {congestion_control} &')
-        print(f"Started client on h3 connecting to server at {h7.IP()}")
-        
-        time.sleep(15)
-        h4.cmd(f'timeout 95 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 90 -C {congestion_control}&')
-        print(f"Started client on h4 connecting to server at {h7.IP()}")
-        time.sleep(150)
-        
-    elif option == 'c':
-        # Case 1: Link S2-S4 with client on h3
-        print( "entered c " )
-        print("Checking if iperf3 server is running on h7...")
-        print(h7.cmd("ps aux | grep '[i]perf3'"))  
-        # Check if iperf3 server process is running
-
-        #if len(sys.argv) >= 4 and sys.argv[3] == '1':
-        if args.case and args.case == '1':
-            h3.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h3 connecting to server at {h7.IP()}")
-            time.sleep(150)
-            
-        # Case 2a: Link S1-S4 with clients on h1, h2
-        elif args.case and args.case == '2a':
-            h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h1 connecting to {h7.IP()}")
-            h2.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h2 connecting to {h7.IP()}")
-            time.sleep(150)
-            
-        # Case 2b: Link S1-S4 with clients on h1, h3
-        elif args.case and args.case == '2b':
-            h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h1 connecting to {h7.IP()}")
-            h3.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h3 connecting to {h7.IP()}")
-            time.sleep(150)
-            
-        # Case 2c: Link S1-S4 with clients on h1, h3, h4
-        elif args.case and args.case == '2c':
-            h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h1 connecting to {h7.IP()}")
-            h3.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h3 connecting to {h7.IP()}")
-            h4.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h4 connecting to {h7.IP()}")
-            time.sleep(150)
-            
-    elif option == 'd':
-        # Same as option c but with link loss configured
-        # Case 1: Link S2-S4 with client on h3
-        if args.case and args.case == '1':
-            h3.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h3 connecting to server at {h7.IP()}")
-            time.sleep(150)
-            
-        # Case 2a: Link S1-S4 with clients on h1, h2
-        elif args.case and args.case == '2a':
-            h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h1 connecting to {h7.IP()}")
-            h2.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h2 connecting to {h7.IP()}")
-            time.sleep(150)
-            
-        # Case 2b: Link S1-S4 with clients on h1, h3
-        elif args.case and args.case == '2b':
-            h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h1 connecting to {h7.IP()}")
-            h3.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h3 connecting to {h7.IP()}")
-            time.sleep(150)
-            
-        # Case 2c: Link S1-S4 with clients on h1, h3, h4
-        elif args.case and args.case == '2c':
-            h1.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h1 connecting to {h7.IP()}")
-            h3.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h3 connecting to {h7.IP()}")
-            h4.cmd(f'timeout 155 iperf3 -c {h7.IP()} -p 5201 -b 10M -P 10 -t 150 -C {congestion_control} &')
-            print(f"Started client on h4 connecting to {h7.IP()}")
-            time.sleep(150)
-    
-    # Start CLI
-    # CLI(net)
 
-    # Stop network
-    net.stop()
+# Clients started in each scenario as (host, start delay in seconds, duration in seconds).
+# Options c and d are keyed by case.
+CLIENT_SCHEDULES = {
+    'a': [('h1', 0, 150)],
+    'b': [('h1', 0, 150), ('h3', 15, 120), ('h4', 30, 90)],
+    '1': [('h3', 0, 150)],
+    '2a': [('h1', 0, 150), ('h2', 0, 150)],
+    '2b': [('h1', 0, 150), ('h3', 0, 150)],
+    '2c': [('h1', 0, 150), ('h3', 0, 150), ('h4', 0, 150)],
+}
+
+# Two-sided 95% Student t quantiles by degrees of freedom
+T_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+        2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+        2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+# iperf3 per-interval lines, e.g. "[SUM]   3.00-4.00   sec  1.19 MBytes  10.0 Mbits/sec ..."
+INTERVAL_RE = re.compile(r'^\[\s*(SUM|\d+)\]\s+([\d.]+)-([\d.]+)\s+sec\s+[\d.]+\s+\w?Bytes\s+'
+                         r'([\d.]+)\s+(\w?)bits/sec(?!.*(sender|receiver))')
+UNITS = {'': 1e-6, 'K': 1e-3, 'M': 1, 'G': 1e3}
+
+
+def read_interval_series(log_file):
+    """Parse the per-second bitrate (Mbps) reported so far in an iperf3 client log"""
+    stream_series = {}
+    sum_series = {}
+    if not os.path.exists(log_file):
+        return {}
+    with open(log_file) as f:
+        for line in f:
+            match = INTERVAL_RE.match(line)
+            if not match:
+                continue
+            stream, _, end, rate, unit = match.groups()[:5]
+            second = int(round(float(end)))
+            mbps = float(rate) * UNITS.get(unit, 1)
+            if stream == 'SUM':
+                sum_series[second] = mbps
+            else:
+                stream_series[second] = stream_series.get(second, 0) + mbps
+    # With -P > 1 iperf3 prints a [SUM] line per interval, otherwise only the stream line
+    return sum_series or stream_series
+
+
+def is_steady(series, window, tolerance):
+    """True once the last `window` complete intervals vary by at most `tolerance` (CV)"""
+    # The most recent second may still be missing some clients
+    seconds = sorted(series)[:-1]
+    if len(seconds) < window:
+        return False
+    values = np.array([series[s] for s in seconds[-window:]])
+    mean = values.mean()
+    return mean > 0 and values.std() / mean <= tolerance
+
+
+def confidence_interval(values):
+    """Mean and 95% confidence half-width of a list of values"""
+    values = np.array(values)
+    if len(values) < 2:
+        return values.mean(), float('inf')
+    dof = len(values) - 1
+    t = T_95[dof - 1] if dof <= len(T_95) else 1.96
+    return values.mean(), t * values.std(ddof=1) / np.sqrt(len(values))
+
+
+def run_trial(net, schedule, congestion_control, log_prefix, servers=None, parallel=10,
+              steady_state=False, steady_window=10, steady_tolerance=0.05, min_duration=20):
+    """Run one trial of a client schedule.
+
+    Returns the per-second aggregate sender bitrate series, the number of
+    clients that reported each second, the trial duration and whether the
+    trial stopped early.
+
+    `servers` maps each client to the (server host, port) it connects to; by
+    default every client uses the iperf3 server on h7:5201. The series is
+    rebuilt from the clients' iperf3 logs every second. With steady_state, the
+    trial stops as soon as all clients have started, at least min_duration
+    seconds have passed and the aggregate throughput is steady.
+    """
+    servers = servers or {}
+    pending = sorted(schedule, key=lambda entry: entry[1])
+    running = []  # (host, pid, log file, start offset)
+    end_time = max(delay + duration for _, delay, duration in schedule)
+    stopped_early = False
+
+    start = time.time()
+    while True:
+        elapsed = time.time() - start
+
+        while pending and pending[0][1] <= elapsed:
+            name, _, duration = pending.pop(0)
+            host = net.get(name)
+            server_name, port = servers.get(name, ('h7', 5201))
+            server = net.get(server_name)
+            log_file = f"{log_prefix}_{name}.log"
+            host.cmd(f'timeout {duration + 5} iperf3 -c {server.IP()} -p {port} -b 10M -P {parallel} -t {duration} '
+                     f'-C {congestion_control} -i 1 --forceflush > {log_file} 2>&1 &')
+            running.append((host, host.lastPid, log_file, time.time() - start))
+            print(f"Started client on {name} connecting to {server.IP()}")
+
+        # Aggregate throughput across clients, aligned to the trial start
+        series = {}
+        reporting = {}
+        for _, _, log_file, offset in running:
+            for second, mbps in read_interval_series(log_file).items():
+                second = int(round(offset)) + second
+                series[second] = series.get(second, 0) + mbps
+                reporting[second] = reporting.get(second, 0) + 1
+
+        if elapsed >= end_time + 5:
+            break
+        if (steady_state and not pending and elapsed >= min_duration
+                and is_steady(series, steady_window, steady_tolerance)):
+            stopped_early = True
+            print(f"Throughput reached steady state after {elapsed:.0f}s, stopping trial")
+            break
+        time.sleep(1)
+
+    for host, pid, _, _ in running:
+        host.cmd(f'kill {pid} 2>/dev/null')
+
+    return series, reporting, time.time() - start, stopped_early
+
+
+def mean_bitrate(series, reporting, clients):
+    """Mean aggregate sender bitrate over complete intervals.
+
+    An interval is complete when every client reported it, which excludes
+    staggered ramp-up and wind-down. The last interval is dropped as well,
+    since it may be partial, the same way is_steady does.
+    """
+    seconds = sorted(series)[:-1]
+    complete = [second for second in seconds if reporting[second] == clients]
+    if not complete:
+        complete = seconds
+    return float(np.mean([series[second] for second in complete])) if complete else 0.0
+
+
+def run_experiment(net, option, congestion_control, case=None, trials=1, min_trials=2,
+                   ci_target=0.05, output_dir='results', schedule=None, **trial_options):
+    """Run up to `trials` trials, stopping once the bitrate confidence interval is tight enough.
+
+    Each trial is scored by its mean aggregate sender bitrate (iperf3's
+    application-level send rate) over complete intervals. The 95% confidence
+    half-width must be within ci_target of the mean (e.g. 0.05 for +/-5%) after
+    at least min_trials trials. The client schedule comes from CLIENT_SCHEDULES
+    unless one is given.
+    """
+    if schedule is None:
+        schedule = CLIENT_SCHEDULES[option if option in ['a', 'b'] else case]
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+
+    for trial in range(1, trials + 1):
+        print(f"Running trial {trial} of up to {trials}...")
+        series, reporting, duration, stopped_early = run_trial(
+            net, schedule, congestion_control, f"{output_dir}/iperf_trial{trial}", **trial_options)
+        bitrate = mean_bitrate(series, reporting, len(schedule))
+        results.append({'trial': trial, 'mean_sender_bitrate_mbps': bitrate, 'duration_s': duration,
+                        'stopped_early': stopped_early,
+                        'series': [series[second] for second in sorted(series)],
+                        'clients_reporting': [reporting[second] for second in sorted(series)]})
+        print(f"Trial {trial}: mean sender bitrate {bitrate:.2f} Mbps over {duration:.0f}s")
+
+        if trial >= max(min_trials, 2):
+            mean, half_width = confidence_interval([r['mean_sender_bitrate_mbps'] for r in results])
+            print(f"Mean sender bitrate so far: {mean:.2f} +/- {half_width:.2f} Mbps (95% CI)")
+            if mean > 0 and half_width <= ci_target * mean:
+                print("Confidence interval is tight enough, no more trials needed")
+                break
+
+        # Let queues drain before the next trial
+        time.sleep(2)
+
+    mean, half_width = confidence_interval([r['mean_sender_bitrate_mbps'] for r in results])
+    with open(f"{output_dir}/trials.json", 'w') as f:
+        json.dump({'option': option, 'case': case, 'congestion': congestion_control,
+                   'mean_sender_bitrate_mbps': mean,
+                   'mean_sender_bitrate_ci95_mbps': half_width if np.isfinite(half_width) else None,
+                   'trials': results}, f, indent=2)
+    return results
 
 
 if __name__ == '__main__':
     # Parse command line arguments
     parser = argparse.ArgumentParser(description='Run TCP congestion control experiments')
-    parser.add_argument('--option', type=str, choices=['a', 'b', 'c', 'd'], required=True,
-                        help='Experiment option to run')
+    parser.add_argument('--option', type=str, choices=['a', 'b', 'c', 'd'],
+                        help='Experiment option to run (fixed topology)')
     parser.add_argument('--congestion', type=str, choices=['highspeed', 'yeah', 'bbr'], required=True,
                         help='TCP congestion control algorithm')
     parser.add_argument('--case', type=str, choices=['1', '2a', '2b', '2c'],
                         help='Specific test case for options c and d')
     parser.add_argument('--loss', type=float, default=0,
                         help='Link loss percentage for option d (1 or 5)')
+    parser.add_argument('--trials', type=int, default=1,
+                        help='Maximum number of repeated trials')
+    parser.add_argument('--min_trials', type=int, default=2,
+                        help='Minimum trials before the confidence interval can stop the run')
+    parser.add_argument('--ci_target', type=float, default=0.05,
+                        help='Stop adding trials once the 95%% CI half-width is within this fraction of the mean sender bitrate')
+    parser.add_argument('--steady_state', action='store_true',
+                        help='Stop each trial once aggregate throughput reaches steady state')
+    parser.add_argument('--steady_window', type=int, default=10,
+                        help='Number of 1-second intervals used to detect steady state')
+    parser.add_argument('--steady_tolerance', type=float, default=0.05,
+                        help='Maximum coefficient of variation over the window to count as steady')
+    parser.add_argument('--min_duration', type=float, default=20,
+                        help='Minimum trial duration in seconds before steady state can stop it')
+    parser.add_argument('--output_dir', type=str, default='results',
+                        help='Directory to save iperf3 logs and trials.json')
+    
+    # Parameterized topologies for scaling studies
+    parser.add_argument('--topology', type=str, choices=['fixed'] + TOPOLOGIES, default='fixed',
+                        help='Topology to build; "fixed" is the 4-switch, 7-host assignment layout')
+    parser.add_argument('--hosts', type=int, default=8,
+                        help='Number of hosts (linear and dumbbell)')
+    parser.add_argument('--switches', type=int, default=4,
+                        help='Number of switches (linear)')
+    parser.add_argument('--k', type=int, default=4,
+                        help='Fat-tree arity (k^3/4 hosts)')
+    parser.add_argument('--duration', type=float, default=150,
+                        help='Flow duration in seconds for scaled topologies')
+    parser.add_argument('--parallel', type=int, default=1,
+                        help='iperf3 streams per flow for scaled topologies')
+    for link in ['host', 'link']:
+        kind = 'host access links' if link == 'host' else 'switch-to-switch links'
+        parser.add_argument(f'--{link}_bw', type=float, help=f'Bandwidth in Mbps of {kind}')
+        parser.add_argument(f'--{link}_delay', type=str, help=f'Delay of {kind} (e.g. 5ms)')
+        parser.add_argument(f'--{link}_loss', type=float, help=f'Loss percentage of {kind}')
+        parser.add_argument(f'--{link}_queue', type=int, help=f'Maximum queue size in packets of {kind}')
 
     args = parser.parse_args()
+    if args.topology == 'fixed' and not args.option:
+        parser.error('--option is required with the fixed topology')
+    if args.topology == 'fixed' and args.option in ['c', 'd'] and not args.case:
+        parser.error('--case is required for options c and d')
+    if args.trials < 1:
+        parser.error('--trials must be at least 1')
+    if args.min_trials < 2:
+        parser.error('--min_trials must be at least 2')
+    if args.steady_window < 2:
+        parser.error('--steady_window must be at least 2')
+    if args.topology != 'fixed':
+        try:
+            check_parameters(args.topology, args.hosts, args.switches, args.k)
+        except ValueError as e:
+            parser.error(str(e))
 
     # Set log level
     setLogLevel('info')
 
     # Run the network
-    create_network(args.option, args.congestion, args.loss, args.case)
+    if args.topology == 'fixed':
+        net, servers = create_network(args.option, args.congestion, args.loss, args.case)
+        schedule, parallel = None, 10
+    else:
+        net, schedule, servers = create_scaled_network(args)
+        parallel = args.parallel
+    
+    try:
+        run_experiment(net, args.option or args.topology, args.congestion, args.case, args.trials,
+                       args.min_trials, args.ci_target, args.output_dir, schedule=schedule,
+                       servers=servers, parallel=parallel, steady_state=args.steady_state,
+                       steady_window=args.steady_window, steady_tolerance=args.steady_tolerance,
+                       min_duration=args.min_duration)
+    finally:
+        # Stop network
+        net.stop()
     
 
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import argparse
+import random
+import struct
+
+# pcap link-layer types
+LINKTYPE_ETHERNET = 1
+LINKTYPE_LINUX_SLL = 113  # what `tcpdump -i any` writes
+
+SERVER_IP = "10.0.0.7"  # h7 in mininet_topology.py
+SERVER_PORT = 5201
+MSS = 1448
+
+# TCP flags
+FIN = 0x01
+SYN = 0x02
+PSH = 0x08
+ACK = 0x10
+
+
+def ip_to_bytes(ip):
+    """Convert a dotted quad into 4 raw bytes"""
+    return bytes(int(part) for part in ip.split('.'))
+
+
+def ip_checksum(header):
+    """Compute the IPv4 header checksum"""
+    total = sum(struct.unpack('!10H', header))
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+def tcp_options(mss=None, wscale=None):
+    """Build TCP options the way Linux does on a SYN (MSS, NOP, WScale)"""
+    options = b''
+    if mss is not None:
+        options += struct.pack('!BBH', 2, 4, mss)
+    if wscale is not None:
+        options += struct.pack('!BBBB', 1, 3, 3, wscale)
+    return options
+
+
+def link_header(linktype, outgoing):
+    """Build the link-layer header for a single frame"""
+    if linktype == LINKTYPE_LINUX_SLL:
+        # packet type, ARPHRD_ETHER, address length, address (8 bytes), protocol
+        packet_type = 4 if outgoing else 0
+        return struct.pack('!HHH8sH', packet_type, 1, 6, b'\x00\x00\x00\x00\x00\x01', 0x0800)
+    dst = b'\x00\x00\x00\x00\x00\x07' if outgoing else b'\x00\x00\x00\x00\x00\x01'
+    src = b'\x00\x00\x00\x00\x00\x01' if outgoing else b'\x00\x00\x00\x00\x00\x07'
+    return dst + src + b'\x08\x00'
+
+
+def build_frame(linktype, src, dst, sport, dport, seq, ack, flags, window,
+                payload_len=0, options=b'', outgoing=True):
+    """Build a complete frame (link + IPv4 + TCP + zero payload).
+
+    The TCP checksum is left at zero, as it is for locally generated traffic
+    captured before checksum offload.
+    """
+    tcp_len = 20 + len(options)
+    total_len = 20 + tcp_len + payload_len
+    ip_header = struct.pack('!BBHHHBBH4s4s', 0x45, 0, total_len, 0, 0x4000, 64, 6, 0, src, dst)
+    ip_header = ip_header[:10] + struct.pack('!H', ip_checksum(ip_header)) + ip_header[12:]
+    tcp_header = struct.pack('!HHIIBBHHH', sport, dport, seq & 0xFFFFFFFF, ack & 0xFFFFFFFF,
+                             (tcp_len // 4) << 4, flags, window, 0, 0) + options
+    return link_header(linktype, outgoing) + ip_header + tcp_header + bytes(payload_len)
+
+
+class Flow:
+    """State of one synthetic iperf3-like bulk transfer"""
+
+    def __init__(self, index, rng, wscale):
+        # Clients live outside 10.0.0.0/24 so none of them can collide with the server
+        self.client = ip_to_bytes(f"10.1.{index // 250}.{index % 250 + 1}")
+        self.server = ip_to_bytes(SERVER_IP)
+        self.sport = 40000 + index
+        self.client_isn = rng.randrange(1 << 32)
+        self.server_isn = rng.randrange(1 << 32)
+        self.wscale = wscale
+        self.seq = self.client_isn + 1
+        self.unacked_segments = 0
+        self.lost = []
+
+
+def flow_packets(flow, rng, linktype, payload, loss, retransmit):
+    """Yield the next frame of a flow on each call to next()"""
+    # Three-way handshake, with window scaling negotiated on the SYN/SYN-ACK
+    syn_options = tcp_options(MSS, flow.wscale) if flow.wscale is not None else tcp_options(MSS)
+    yield build_frame(linktype, flow.client, flow.server, flow.sport, SERVER_PORT,
+                      flow.client_isn, 0, SYN, 64240, options=syn_options)
+    yield build_frame(linktype, flow.server, flow.client, SERVER_PORT, flow.sport,
+                      flow.server_isn, flow.client_isn + 1, SYN | ACK, 65160,
+                      options=syn_options, outgoing=False)
+    yield build_frame(linktype, flow.client, flow.server, flow.sport, SERVER_PORT,
+                      flow.seq, flow.server_isn + 1, ACK, 502)
+
+    while True:
+        # Retransmit a segment that was "lost" earlier
+        if flow.lost and rng.random() < 0.5:
+            seq = flow.lost.pop(0)
+            yield build_frame(linktype, flow.client, flow.server, flow.sport, SERVER_PORT,
+                              seq, flow.server_isn + 1, ACK | PSH, 502, payload)
+            continue
+
+        seq = flow.seq
+        flow.seq += payload
+        if rng.random() < loss:
+            # Dropped before the capture point: only the retransmission shows up
+            flow.lost.append(seq)
+            continue
+
+        yield build_frame(linktype, flow.client, flow.server, flow.sport, SERVER_PORT,
+                          seq, flow.server_isn + 1, ACK | PSH, 502, payload)
+        if rng.random() < retransmit:
+            # Spurious retransmission of the segment we just sent
+            yield build_frame(linktype, flow.client, flow.server, flow.sport, SERVER_PORT,
+                              seq, flow.server_isn + 1, ACK | PSH, 502, payload)
+
+        # Delayed ACK: the receiver acknowledges every second segment
+        flow.unacked_segments += 1
+        if flow.unacked_segments == 2:
+            flow.unacked_segments = 0
+            window = rng.randrange(1000, 65535)
+            # A cumulative ACK cannot pass a hole, so lost segments produce duplicate ACKs
+            ack = min(flow.lost) if flow.lost else flow.seq
+            yield build_frame(linktype, flow.server, flow.client, SERVER_PORT, flow.sport,
+                              flow.server_isn + 1, ack, ACK, window, outgoing=False)
+
+
+def generate_pcap(output_file, packets, flows=10, rate=10000, loss=0.0, retransmit=0.0,
+                  wscale=7, sll=False, snaplen=65535, payload=MSS, seed=0):
+    """Write a deterministic synthetic TCP capture and return the packet count.
+
+    Packets are spread evenly over `packets / rate` seconds and interleaved
+    across `flows` concurrent connections to h7:5201. The same arguments
+    always produce a byte-identical file.
+    """
+    rng = random.Random(seed)
+    linktype = LINKTYPE_LINUX_SLL if sll else LINKTYPE_ETHERNET
+    generators = [flow_packets(Flow(i, rng, wscale), rng, linktype, payload, loss, retransmit)
+                  for i in range(flows)]
+
+    # Flows are started one after another so every handshake is captured
+    started = 0
+    start_time = 1700000000.0
+    record = struct.Struct('<IIII')
+    written = 0
+
+    with open(output_file, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, snaplen, linktype))
+        chunk = []
+        while written < packets:
+            if started < flows and (started == 0 or rng.random() < 0.5):
+                started += 1
+            frame = next(generators[rng.randrange(started)])
+
+            timestamp = start_time + written / rate
+            sec = int(timestamp)
+            usec = int(round((timestamp - sec) * 1e6))
+            if usec == 1000000:
+                sec, usec = sec + 1, 0
+            captured = frame[:snaplen]
+            chunk.append(record.pack(sec, usec, len(captured), len(frame)))
+            chunk.append(captured)
+            written += 1
+
+            if len(chunk) >= 8192:
+                f.write(b''.join(chunk))
+                chunk = []
+        f.write(b''.join(chunk))
+
+    return written
+
+
+def write_connection_file(output_file, connections, seed=0):
+    """Write a connection listing in the format Task_2/analysis.py reads"""
+    rng = random.Random(seed)
+    with open(output_file, 'w') as f:
+        for i in range(connections):
+            src_ip = f"192.168.200.{rng.randrange(2, 254)}"
+            duration = rng.expovariate(1 / 5.0)
+            f.write(f"{src_ip} 192.168.200.133 4999 {i} {duration:.6f}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic TCP capture')
+    parser.add_argument('--output', type=str, required=True,
+                        help='Path of the pcap file to write')
+    parser.add_argument('--packets', type=int,
+                        help='Number of packets to write (overrides --duration)')
+    parser.add_argument('--duration', type=float, default=150,
+                        help='Capture duration in seconds')
+    parser.add_argument('--rate', type=float, default=10000,
+                        help='Packets per second across all flows')
+    parser.add_argument('--flows', type=int, default=10,
+                        help='Number of concurrent TCP flows')
+    parser.add_argument('--loss', type=float, default=0.0,
+                        help='Fraction of data segments lost and later retransmitted')
+    parser.add_argument('--retransmit', type=float, default=0.0,
+                        help='Fraction of data segments spuriously retransmitted')
+    parser.add_argument('--wscale', type=int, default=7,
+                        help='Window scale shift negotiated in the handshake (-1 to omit)')
+    parser.add_argument('--sll', action='store_true',
+                        help='Use Linux cooked (SLL) framing like `tcpdump -i any`')
+    parser.add_argument('--snaplen', type=int, default=65535,
+                        help='Snapshot length (run_experiments.sh uses 128)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed')
+
+    args = parser.parse_args()
+
+    packets = args.packets if args.packets is not None else int(args.duration * args.rate)
+    wscale = args.wscale if args.wscale >= 0 else None
+    written = generate_pcap(args.output, packets, args.flows, args.rate, args.loss,
+                            args.retransmit, wscale, args.sll, args.snaplen, seed=args.seed)
+    print(f"Wrote {written} packets to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import collections
+import contextlib
+import json
+import os
+import resource
+import signal
+import time
+
+# Shared no-op context returned when profiling is off, so instrumented code
+# pays for a single attribute check and nothing else.
+_DISABLED_STAGE = contextlib.nullcontext()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB (ru_maxrss is in KB on Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB"""
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * resource.getpagesize() / (1024 * 1024)
+
+
+class Stage:
+    """Timing and counters for one instrumented stage"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.packets = 0
+        self.bytes_read = 0
+
+    def __enter__(self):
+        self.profiler.active = self
+        self.rss_start = current_rss_mb()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        self.profiler.active = None
+        self.profiler.stages.append({
+            'stage': self.name,
+            'wall_s': wall,
+            'cpu_s': cpu,
+            'packets': self.packets,
+            'packets_per_s': self.packets / wall if wall > 0 else 0,
+            'bytes_read': self.bytes_read,
+            'rss_start_mb': self.rss_start,
+            'rss_end_mb': current_rss_mb(),
+            # ru_maxrss only grows, so this is the process peak up to the end of the stage
+            'process_peak_rss_mb': peak_rss_mb(),
+        })
+        return False
+
+
+class Profiler:
+    """Per-stage wall/CPU time, packet and byte counters and peak memory.
+
+    Stages are recorded in the order they run, so a stage that runs more than
+    once (e.g. reading the pcap for every metric) shows up once per run.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = []
+        self.active = None
+        self.sampler = None
+
+    def stage(self, name):
+        """Context manager that times a stage, or a no-op when disabled"""
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return Stage(self, name)
+
+    def count(self, packets=0, bytes_read=0):
+        """Attribute processed packets and bytes read to the running stage"""
+        if self.active is not None:
+            self.active.packets += packets
+            self.active.bytes_read += bytes_read
+
+    def start_sampling(self, interval=0.005):
+        """Start the sampling profiler used to build a flame graph"""
+        self.sampler = StackSampler(interval)
+        self.sampler.start()
+
+    def report(self, **metadata):
+        """Build the structured report as a dict"""
+        totals = collections.OrderedDict()
+        for stage in self.stages:
+            total = totals.setdefault(stage['stage'], {'stage': stage['stage'], 'calls': 0,
+                                                       'wall_s': 0.0, 'cpu_s': 0.0,
+                                                       'packets': 0, 'bytes_read': 0})
+            total['calls'] += 1
+            total['wall_s'] += stage['wall_s']
+            total['cpu_s'] += stage['cpu_s']
+            total['packets'] += stage['packets']
+            total['bytes_read'] += stage['bytes_read']
+        for total in totals.values():
+            total['packets_per_s'] = total['packets'] / total['wall_s'] if total['wall_s'] > 0 else 0
+
+        return dict(metadata,
+                    wall_s=sum(s['wall_s'] for s in self.stages),
+                    cpu_s=sum(s['cpu_s'] for s in self.stages),
+                    bytes_read=sum(s['bytes_read'] for s in self.stages),
+                    process_peak_rss_mb=peak_rss_mb(),
+                    totals=list(totals.values()),
+                    stages=self.stages)
+
+    def write_report(self, output_file, **metadata):
+        """Write the JSON report"""
+        with open(output_file, 'w') as f:
+            json.dump(self.report(**metadata), f, indent=2)
+
+    def write_flamegraph(self, output_file):
+        """Stop the sampler and write its stacks in folded format"""
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler.write_folded(output_file)
+
+
+class StackSampler:
+    """Signal-based sampling profiler.
+
+    Samples the main thread's Python stack every `interval` seconds of CPU
+    time and counts identical stacks. The output is in the "folded" format
+    read by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = collections.Counter()
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        self.samples[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def write_folded(self, output_file):
+        with open(output_file, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
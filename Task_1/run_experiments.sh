@@ -7,6 +7,13 @@ mkdir -p $RESULTS_DIR
 # List of congestion control algorithms to test
 CONGESTION_SCHEMES=("highspeed" "yeah" "bbr")
 
+# Set PROFILE=1 to write per-stage analyzer timings next to each summary
+PROFILE=${PROFILE:-0}
+
+# Repeated trials per scenario; set STEADY_STATE=1 to end trials early once throughput is steady
+TRIALS=${TRIALS:-1}
+STEADY_STATE=${STEADY_STATE:-0}
+
 
 # Function to run a single experiment
 run_experiment() {
@@ -38,19 +45,26 @@ run_experiment() {
     
     # Start tcpdump to capture traffic
     echo "Starting packet capture..."
-    sudo tcpdump -i any tcp port 5201 -s 128 -w $pcap_file &
+    # Each client gets its own iperf3 server port starting at 5201
+    sudo tcpdump -i any tcp portrange 5201-5299 -s 128 -w $pcap_file &
     TCPDUMP_PID=$!
     
+    # Trial options shared by every scenario
+    local trial_args="--trials=$TRIALS --output_dir=$exp_dir"
+    if [ "$STEADY_STATE" = "1" ]; then
+        trial_args="$trial_args --steady_state"
+    fi
+    
     # Run mininet experiment
     if [ -z "$case" ] && [ -z "$loss" ]; then
     	echo "No case && No Loss! "
-        sudo python3 mininet_topology.py --option=$option --congestion=$congestion
+        sudo python3 mininet_topology.py --option=$option --congestion=$congestion $trial_args
     elif [ -z "$loss" ]; then
     	echo "Only case! "
-        sudo python3 mininet_topology.py --option=$option --congestion=$congestion --case=$case
+        sudo python3 mininet_topology.py --option=$option --congestion=$congestion --case=$case $trial_args
     else
     	echo "Both case && Loss! "
-        sudo python3 mininet_topology.py --option=$option --congestion=$congestion --case=$case --loss=$loss
+        sudo python3 mininet_topology.py --option=$option --congestion=$congestion --case=$case --loss=$loss $trial_args
     fi
     
     # Give some time for tcpdump to finish writing
@@ -65,7 +79,14 @@ run_experiment() {
     
     # Analyze the captured traffic
     echo "Analyzing traffic..."
-    sudo python3 traffic_analyzer.py --pcap=$pcap_file --congestion=$congestion --output_dir=$exp_dir
+    if [ "$PROFILE" = "1" ]; then
+        sudo python3 traffic_analyzer.py --pcap=$pcap_file --congestion=$congestion --output_dir=$exp_dir --profile
+    else
+        sudo python3 traffic_analyzer.py --pcap=$pcap_file --congestion=$congestion --output_dir=$exp_dir
+    fi
+    
+    # Refresh the cross-experiment comparison report (only this experiment is recomputed)
+    python3 aggregate_results.py --results_dir=$RESULTS_DIR --output_dir=${RESULTS_DIR}/report
     
     echo "Experiment completed. Results saved to $exp_dir"
     echo "----------------------------------------"
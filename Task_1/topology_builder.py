@@ -0,0 +1,206 @@
+from functools import partial
+import tempfile
+import time
+
+from mininet.net import Mininet
+from mininet.node import Controller, OVSSwitch
+from mininet.link import TCLink
+from mininet.topo import Topo
+from mininet.util import quietRun
+
+TOPOLOGIES = ['linear', 'dumbbell', 'fattree']
+
+
+def link_options(bw=None, delay=None, loss=None, queue=None):
+    """Build TCLink parameters, leaving out anything that was not set"""
+    options = {'bw': bw, 'delay': delay, 'loss': loss, 'max_queue_size': queue}
+    return {key: value for key, value in options.items() if value}
+
+
+class PrecreatedTCLink(TCLink):
+    """TCLink over a veth pair that BatchedMininet has already created"""
+
+    @classmethod
+    def makeIntfPair(cls, *args, **kwargs):
+        pass
+
+
+class BatchedMininet(Mininet):
+    """Mininet that creates all of its topology's veth pairs with one `ip -batch` call.
+
+    Stock Mininet runs a separate `ip link add` for every link. Here the first
+    addLink() of the build, when all hosts and switches exist, writes every
+    pair to a batch file and creates them together, each end directly in its
+    node's namespace. Links then only wrap the existing interfaces. Traffic
+    control is still set up per interface with its own tc commands.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.veth_macs = None
+        Mininet.__init__(self, *args, **kwargs)
+
+    def create_veths(self):
+        """Create the veth pair of every topology link in a single ip -batch run"""
+        self.veth_macs = {}
+        lines = []
+        for _, _, info in self.topo.links(sort=True, withInfo=True):
+            ends = []
+            for node, port in [(self[info['node1']], info['port1']), (self[info['node2']], info['port2'])]:
+                netns = f' netns {node.pid}' if node.inNamespace else ''
+                ends.append((f'{node.name}-eth{port}', self.randMac(), netns))
+            (name1, mac1, netns1), (name2, mac2, netns2) = ends
+            lines.append(f'link add name {name1} address {mac1}{netns1} '
+                         f'type veth peer name {name2} address {mac2}{netns2}')
+            self.veth_macs[(info['node1'], info['port1'])] = (mac1, mac2)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.batch') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            output = quietRun(f'ip -batch {f.name}')
+        if output:
+            raise RuntimeError(f"Error creating veth pairs: {output}")
+
+    def addLink(self, node1, node2, port1=None, port2=None, cls=None, **params):
+        if self.topo is not None and self.veth_macs is None:
+            self.create_veths()
+        macs = (self.veth_macs or {}).get((getattr(node1, 'name', node1), port1))
+        if macs and cls is None:
+            cls = PrecreatedTCLink
+            params.update(addr1=macs[0], addr2=macs[1])
+        return Mininet.addLink(self, node1, node2, port1, port2, cls, **params)
+
+
+class LinearTopo(Topo):
+    """M switches in a chain with N hosts spread across them.
+
+    Every host sends to the last host, so flows cross a growing number of hops.
+    """
+
+    def build(self, hosts=7, switches=4, host_link=None, core_link=None):
+        switch_nodes = [self.addSwitch(f's{i + 1}') for i in range(switches)]
+        for a, b in zip(switch_nodes, switch_nodes[1:]):
+            self.addLink(a, b, **(core_link or {}))
+
+        # The server sits alone on the last switch, clients fill the others round-robin
+        host_nodes = [self.addHost(f'h{i + 1}') for i in range(hosts)]
+        client_switches = switch_nodes[:-1] or switch_nodes
+        for i, host in enumerate(host_nodes[:-1]):
+            self.addLink(host, client_switches[i % len(client_switches)], **(host_link or {}))
+        self.addLink(host_nodes[-1], switch_nodes[-1], **(host_link or {}))
+
+        self.pairs = [(host, host_nodes[-1]) for host in host_nodes[:-1]]
+
+
+class DumbbellTopo(Topo):
+    """N/2 senders and N/2 receivers on either side of a single bottleneck link"""
+
+    def build(self, hosts=8, host_link=None, core_link=None):
+        left = self.addSwitch('s1')
+        right = self.addSwitch('s2')
+        self.addLink(left, right, **(core_link or {}))
+
+        senders = [self.addHost(f'h{i + 1}') for i in range(hosts // 2)]
+        receivers = [self.addHost(f'h{hosts // 2 + i + 1}') for i in range(hosts // 2)]
+        for host in senders:
+            self.addLink(host, left, **(host_link or {}))
+        for host in receivers:
+            self.addLink(host, right, **(host_link or {}))
+
+        self.pairs = list(zip(senders, receivers))
+
+
+class FatTreeTopo(Topo):
+    """k-ary fat-tree: k pods of k/2 edge and k/2 aggregation switches, (k/2)^2 core
+    switches and k^3/4 hosts. Each host sends to the host half the tree away, so
+    every flow crosses the core.
+    """
+
+    def build(self, k=4, host_link=None, core_link=None):
+        half = k // 2
+        count = iter(range(1, 5 * k * k))
+        core = [self.addSwitch(f's{next(count)}') for _ in range(half * half)]
+        host_nodes = []
+
+        for pod in range(k):
+            aggregation = [self.addSwitch(f's{next(count)}') for _ in range(half)]
+            edge = [self.addSwitch(f's{next(count)}') for _ in range(half)]
+            for i, agg in enumerate(aggregation):
+                # Aggregation switch i connects to core switches i*k/2 .. (i+1)*k/2 - 1
+                for j in range(half):
+                    self.addLink(agg, core[i * half + j], **(core_link or {}))
+                for sw in edge:
+                    self.addLink(agg, sw, **(core_link or {}))
+            for sw in edge:
+                for _ in range(half):
+                    host = self.addHost(f'h{len(host_nodes) + 1}')
+                    self.addLink(host, sw, **(host_link or {}))
+                    host_nodes.append(host)
+
+        n = len(host_nodes)
+        self.pairs = [(host_nodes[i], host_nodes[(i + n // 2) % n]) for i in range(n // 2)]
+
+
+def check_parameters(topology, hosts=8, switches=4, k=4):
+    """Raise ValueError if the parameters cannot build a topology with at least one flow"""
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown topology: {topology}")
+    if topology == 'linear':
+        if hosts < 2:
+            raise ValueError("a linear topology needs at least 2 hosts (one client and the server)")
+        if switches < 1:
+            raise ValueError("a linear topology needs at least 1 switch")
+    elif topology == 'dumbbell':
+        if hosts < 2 or hosts % 2:
+            raise ValueError("a dumbbell topology needs an even number of hosts, at least 2")
+    elif k < 2 or k % 2:
+        raise ValueError("a fat-tree needs an even k of at least 2")
+
+
+def build_network(topology, hosts=8, switches=4, k=4, host_link=None, core_link=None, stp_wait=30):
+    """Build and start a parameterized topology.
+
+    Returns the running network, the (client, server) host name pairs for its
+    flows, and a dict of setup timings. All veth pairs are created with one
+    `ip -batch` call (see BatchedMininet); tc setup and switch start-up are
+    Mininet's own. Fat-trees contain loops, so their switches run standalone with STP instead
+    of using a controller and the network waits for STP to converge before it is
+    returned. That fixed wait is reported as stp_wait_s and is not part of total_s.
+    """
+    check_parameters(topology, hosts, switches, k)
+    timings = {}
+    start = time.time()
+
+    if topology == 'linear':
+        topo = LinearTopo(hosts=hosts, switches=switches, host_link=host_link, core_link=core_link)
+    elif topology == 'dumbbell':
+        topo = DumbbellTopo(hosts=hosts, host_link=host_link, core_link=core_link)
+    else:
+        topo = FatTreeTopo(k=k, host_link=host_link, core_link=core_link)
+    timings['topology_s'] = time.time() - start
+
+    if topology == 'fattree':
+        net = BatchedMininet(topo=topo, switch=partial(OVSSwitch, failMode='standalone', stp=True),
+                             controller=None, link=TCLink, build=False)
+    else:
+        net = BatchedMininet(topo=topo, switch=OVSSwitch, controller=Controller, link=TCLink, build=False)
+
+    build_start = time.time()
+    net.build()
+    timings['build_s'] = time.time() - build_start
+
+    start_switches = time.time()
+    net.start()
+    timings['start_s'] = time.time() - start_switches
+    timings['total_s'] = time.time() - start
+
+    if topology == 'fattree' and stp_wait:
+        print(f"Waiting {stp_wait}s for STP to converge...")
+        time.sleep(stp_wait)
+        timings['stp_wait_s'] = stp_wait
+    timings['hosts'] = len(net.hosts)
+    timings['switches'] = len(net.switches)
+    timings['links'] = len(net.links)
+    print(f"Built {topology} topology with {timings['hosts']} hosts, {timings['switches']} switches "
+          f"and {timings['links']} links in {timings['total_s']:.2f}s")
+
+    return net, topo.pairs, timings
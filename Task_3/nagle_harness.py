@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import collections
+import ctypes
+import json
+import socket
+import struct
+import subprocess
+import time
+
+PORT = 4999
+BUFFER_SIZE = 40
+RATE = 40  # bytes/sec
+FILE_SIZE = 4096
+
+# IPv4 (20 bytes) + TCP with timestamps (32 bytes)
+HEADER_BYTES = 52
+
+# The four Nagle / Delayed-ACK combinations from the assignment
+CONFIGS = [
+    {'name': 'nagle_on_delack_on', 'nagle': True, 'delayed_ack': True},
+    {'name': 'nagle_on_delack_off', 'nagle': True, 'delayed_ack': False},
+    {'name': 'nagle_off_delack_on', 'nagle': False, 'delayed_ack': True},
+    {'name': 'nagle_off_delack_off', 'nagle': False, 'delayed_ack': False},
+]
+
+# struct tcp_info from linux/tcp.h, up to tcpi_bytes_retrans
+TCP_INFO_FIELDS = [
+    'state', 'ca_state', 'retransmits', 'probes', 'backoff', 'options', 'wscale', 'app_limited',
+    'rto', 'ato', 'snd_mss', 'rcv_mss', 'unacked', 'sacked', 'lost', 'retrans', 'fackets',
+    'last_data_sent', 'last_ack_sent', 'last_data_recv', 'last_ack_recv', 'pmtu', 'rcv_ssthresh',
+    'rtt', 'rttvar', 'snd_ssthresh', 'snd_cwnd', 'advmss', 'reordering', 'rcv_rtt', 'rcv_space',
+    'total_retrans',
+    'pacing_rate', 'max_pacing_rate', 'bytes_acked', 'bytes_received',
+    'segs_out', 'segs_in', 'notsent_bytes', 'min_rtt', 'data_segs_in', 'data_segs_out',
+    'delivery_rate', 'busy_time', 'rwnd_limited', 'sndbuf_limited',
+    'delivered', 'delivered_ce',
+    'bytes_sent', 'bytes_retrans',
+]
+TCP_INFO_STRUCT = struct.Struct('<8B24I4Q6I4Q2I2Q')
+
+# The fields summarize() reads; samples keep only these to bound memory on long runs
+SAMPLE_FIELDS = ('data_segs_out', 'bytes_sent', 'unacked', 'rtt', 'total_retrans', 'ato')
+
+CLONE_NEWNET = 0x40000000
+NETNS = {'client': ('nagle_client', 'veth_nc', '10.200.0.1'),
+         'server': ('nagle_server', 'veth_ns', '10.200.0.2')}
+
+
+def tcp_info(sock):
+    """Read TCP_INFO from a socket as a dict (fields the kernel does not report are 0)"""
+    raw = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, TCP_INFO_STRUCT.size)
+    raw = raw.ljust(TCP_INFO_STRUCT.size, b'\0')
+    return dict(zip(TCP_INFO_FIELDS, TCP_INFO_STRUCT.unpack(raw)))
+
+
+def tcp_sample(sock):
+    """Read the SAMPLE_FIELDS subset of TCP_INFO from a socket"""
+    info = tcp_info(sock)
+    return {field: info[field] for field in SAMPLE_FIELDS}
+
+
+def setup_netns(delay=None):
+    """Create a client and a server network namespace joined by a veth pair"""
+    (client_ns, client_if, client_ip), (server_ns, server_if, server_ip) = NETNS['client'], NETNS['server']
+    commands = [
+        f'ip netns add {client_ns}',
+        f'ip netns add {server_ns}',
+        f'ip link add {client_if} type veth peer name {server_if}',
+        f'ip link set {client_if} netns {client_ns}',
+        f'ip link set {server_if} netns {server_ns}',
+        f'ip -n {client_ns} addr add {client_ip}/24 dev {client_if}',
+        f'ip -n {server_ns} addr add {server_ip}/24 dev {server_if}',
+        f'ip -n {client_ns} link set {client_if} up',
+        f'ip -n {server_ns} link set {server_if} up',
+        f'ip -n {client_ns} link set lo up',
+        f'ip -n {server_ns} link set lo up',
+    ]
+    if delay:
+        # Half the delay in each direction gives an RTT of `delay`
+        commands += [f'ip netns exec {ns} tc qdisc add dev {dev} root netem delay {delay / 2}ms'
+                     for ns, dev, _ in NETNS.values()]
+    for cmd in commands:
+        subprocess.run(cmd, shell=True, check=True)
+
+
+def teardown_netns():
+    """Remove the namespaces created by setup_netns (the veth pair goes with them)"""
+    for ns, _, _ in NETNS.values():
+        subprocess.run(f'ip netns del {ns}', shell=True, stderr=subprocess.DEVNULL)
+
+
+def create_socket(netns=None):
+    """Create a non-blocking TCP socket, optionally inside a named network namespace.
+
+    Network namespaces are per thread, so the thread briefly switches into the
+    target namespace to create the socket; the socket stays there afterwards.
+    """
+    if netns is None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    else:
+        libc = ctypes.CDLL(None, use_errno=True)
+        with open('/proc/self/ns/net') as own, open(f'/var/run/netns/{netns}') as target:
+            if libc.setns(target.fileno(), CLONE_NEWNET) != 0:
+                raise OSError(ctypes.get_errno(), f"setns into {netns} failed")
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            finally:
+                libc.setns(own.fileno(), CLONE_NEWNET)
+    sock.setblocking(False)
+    return sock
+
+
+class Trial:
+    """State shared by the client, server and samplers of one configuration"""
+
+    def __init__(self, config, port):
+        self.config = config
+        self.port = port
+        self.client_samples = []
+        self.server_samples = []
+        self.recv_sizes = []
+        self.bytes_received = 0
+        self.start = None
+        self.end = None
+        self.pending_send = None  # time of the oldest unacknowledged send
+        self.ack_delays = []
+
+
+async def sample(trial, sock, samples, interval, track_acks=False):
+    """Sample TCP_INFO on a socket until cancelled"""
+    while True:
+        info = tcp_sample(sock)
+        now = time.monotonic()
+        samples.append((now, info))
+        # ACK delay: time from a send until the socket has nothing unacknowledged
+        if track_acks and trial.pending_send is not None and info['unacked'] == 0:
+            trial.ack_delays.append(now - trial.pending_send)
+            trial.pending_send = None
+        await asyncio.sleep(interval)
+
+
+async def stop(task):
+    """Cancel a sampler and wait for it to finish"""
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+async def run_server(trial, listener, interval):
+    """Accept one connection and receive until the client closes it"""
+    loop = asyncio.get_running_loop()
+    conn, _ = await loop.sock_accept(listener)
+    listener.close()
+    conn.setblocking(False)
+    if not trial.config['nagle']:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if not trial.config['delayed_ack']:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+
+    sampler = asyncio.ensure_future(sample(trial, conn, trial.server_samples, interval))
+    while True:
+        data = await loop.sock_recv(conn, BUFFER_SIZE)
+        if not data:
+            break
+        trial.recv_sizes.append(len(data))
+        trial.bytes_received += len(data)
+        # The kernel clears TCP_QUICKACK again, so it has to be re-armed after every recv
+        if not trial.config['delayed_ack']:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
+    trial.end = time.monotonic()
+    await stop(sampler)
+    conn.close()
+
+
+async def run_client(trial, payload, host, chunk, rate, interval, netns=None):
+    """Send the payload in `chunk`-byte writes at `rate` bytes/sec"""
+    loop = asyncio.get_running_loop()
+    sock = create_socket(netns)
+    if not trial.config['nagle']:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    await loop.sock_connect(sock, (host, trial.port))
+
+    trial.start = time.monotonic()
+    # Baseline taken before the first write, so the first data segment is counted
+    # even if the sampler task does not get to run until after it is sent
+    trial.client_samples.append((trial.start, tcp_sample(sock)))
+    sampler = asyncio.ensure_future(sample(trial, sock, trial.client_samples, interval, track_acks=True))
+    for offset in range(0, len(payload), chunk):
+        await loop.sock_sendall(sock, payload[offset:offset + chunk])
+        if trial.pending_send is None:
+            trial.pending_send = time.monotonic()
+        await asyncio.sleep(chunk / rate)
+
+    # Let the last segment be acknowledged before closing
+    deadline = time.monotonic() + 1
+    while tcp_info(sock)['unacked'] and time.monotonic() < deadline:
+        await asyncio.sleep(interval)
+    await stop(sampler)
+    trial.client_samples.append((time.monotonic(), tcp_sample(sock)))
+    sock.close()
+
+
+def summarize(trial):
+    """Compute throughput, goodput, loss, segment sizes and ACK delay for one trial"""
+    duration = trial.end - trial.start
+    final = trial.client_samples[-1][1]
+
+    # Segment sizes from consecutive samples; at the default sampling rate
+    # nearly every interval contains at most one new data segment.
+    segment_sizes = collections.Counter()
+    for (_, before), (_, after) in zip(trial.client_samples, trial.client_samples[1:]):
+        segments = after['data_segs_out'] - before['data_segs_out']
+        sent = after['bytes_sent'] - before['bytes_sent']
+        if segments > 0:
+            segment_sizes[round(sent / segments)] += segments
+
+    ack_delays = sorted(trial.ack_delays)
+    server_ato = [info['ato'] for _, info in trial.server_samples if info['ato']]
+    rtts = [info['rtt'] for _, info in trial.client_samples if info['rtt']]
+
+    return {
+        'config': trial.config['name'],
+        'nagle': trial.config['nagle'],
+        'delayed_ack': trial.config['delayed_ack'],
+        'duration_s': duration,
+        'bytes_received': trial.bytes_received,
+        'throughput_bps': (final['bytes_sent'] + HEADER_BYTES * final['data_segs_out']) * 8 / duration,
+        'goodput_bps': trial.bytes_received * 8 / duration,
+        'data_segments': final['data_segs_out'],
+        'retransmissions': final['total_retrans'],
+        'packet_loss_rate': final['total_retrans'] / final['data_segs_out'] if final['data_segs_out'] else 0,
+        'max_segment_bytes': max(segment_sizes) if segment_sizes else 0,
+        'segment_size_distribution': dict(sorted(segment_sizes.items())),
+        'mean_recv_bytes': sum(trial.recv_sizes) / len(trial.recv_sizes) if trial.recv_sizes else 0,
+        'ack_delay_ms': {
+            'mean': 1e3 * sum(ack_delays) / len(ack_delays) if ack_delays else 0,
+            'median': 1e3 * ack_delays[len(ack_delays) // 2] if ack_delays else 0,
+            'max': 1e3 * ack_delays[-1] if ack_delays else 0,
+        },
+        'mean_rtt_ms': sum(rtts) / len(rtts) / 1e3 if rtts else 0,
+        'server_ato_ms': max(server_ato) / 1e3 if server_ato else 0,
+    }
+
+
+async def run_matrix(payload, args):
+    """Run every configuration concurrently, each on its own port"""
+    server_ns = NETNS['server'][0] if args.netns else None
+    client_ns = NETNS['client'][0] if args.netns else None
+    host = NETNS['server'][2] if args.netns else '127.0.0.1'
+
+    trials = []
+    tasks = []
+    for i, config in enumerate(CONFIGS):
+        trial = Trial(config, args.port + i)
+        listener = create_socket(server_ns)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind((host, trial.port))
+        listener.listen(1)
+        trials.append(trial)
+        tasks.append(run_server(trial, listener, args.sample_interval))
+        tasks.append(run_client(trial, payload, host, args.chunk, args.rate,
+                                args.sample_interval, client_ns))
+        print(f"Started {config['name']} on port {trial.port}")
+
+    await asyncio.gather(*tasks)
+    return [summarize(trial) for trial in trials]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Nagle's algorithm / Delayed-ACK experiment matrix")
+    parser.add_argument('--file', type=str,
+                        help='File to send (default: 4 KB of generated text)')
+    parser.add_argument('--size', type=int, default=FILE_SIZE,
+                        help='Size of the generated payload in bytes')
+    parser.add_argument('--rate', type=float, default=RATE,
+                        help='Transfer rate in bytes/sec')
+    parser.add_argument('--chunk', type=int, default=BUFFER_SIZE,
+                        help='Bytes per write')
+    parser.add_argument('--port', type=int, default=PORT,
+                        help='First port; each configuration uses the next one')
+    parser.add_argument('--sample-interval', type=float, default=0.002,
+                        help='TCP_INFO sampling interval in seconds')
+    parser.add_argument('--netns', action='store_true',
+                        help='Run client and server in separate network namespaces (needs root)')
+    parser.add_argument('--delay', type=float,
+                        help='With --netns, round-trip delay in ms added with netem')
+    parser.add_argument('--output', type=str, default='nagle_results.json',
+                        help='Path to save the results')
+
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, 'rb') as f:
+            payload = f.read()
+    else:
+        line = b'The quick brown fox jumps over the lazy dog.\n'
+        payload = (line * (args.size // len(line) + 1))[:args.size]
+
+    print(f"Sending {len(payload)} bytes at {args.rate:g} bytes/sec "
+          f"(~{len(payload) / args.rate:.0f}s) for {len(CONFIGS)} configurations concurrently")
+
+    if args.netns:
+        teardown_netns()
+        setup_netns(args.delay)
+    try:
+        results = asyncio.run(run_matrix(payload, args))
+    finally:
+        if args.netns:
+            teardown_netns()
+
+    print(f"\n{'Configuration':<22} {'Throughput':>12} {'Goodput':>10} {'Loss':>7} "
+          f"{'Max seg':>8} {'ACK delay':>10}")
+    for r in results:
+        print(f"{r['config']:<22} {r['throughput_bps']:>8.1f} bps {r['goodput_bps']:>6.1f} bps "
+              f"{r['packet_loss_rate']:>7.4f} {r['max_segment_bytes']:>6d} B "
+              f"{r['ack_delay_ms']['mean']:>7.2f} ms")
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()